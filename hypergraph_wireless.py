@@ -25,7 +25,7 @@ https://arxiv.org/pdf/2207.00515
 
 The Python code below creates the hypergraph H of a wireless network. 
 The data structure used is the following:  The edge set E is stored 
-as a dictionary where E[k] is the list of edges of size k.  
+as a dictionary where E[k] is the set of edges of size k.  
 The set of edges of size k is a subset of the k-th level set 
 in the poset of all subsets of V.  This makes it convenient to 
 visualize the data structure for the hypergraph's edge set: because 
@@ -38,21 +38,36 @@ of the poset) can be removed.
 
 import random
 import itertools
-from itertools import chain, combinations
 import math
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    #numba is optional: without it the kernels below run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+    prange = range
 
 # alpha_range = [4, 20]
 # alpha=4
 
+#an energy within energy_tol below beta counts as reaching beta, so that 
+#floating-point error cannot flip the outcome of a test that is exact on paper
+energy_tol = 1e-9
+
 def Euclidean_distance(a,b):
     #input: vectors a and b in R^n
     #output: the Euclidean distance between the vectors
-    res = 0
     n = len(a)
+    if n == 2:
+        return math.hypot(a[0]-b[0], a[1]-b[1])
+    res = 0
     for i in range(n):
         res = res + (a[i]-b[i])**2
-    res = res ** 0.5
-    return res
+    return math.sqrt(res)
         
 def compute_interference(a,b, alpha):
     #a, b are points in R^2, alpha is the path loss exponent
@@ -75,9 +90,9 @@ def compute_worst_case_interference(W, alpha):
     #output: worst-case (maximum) interference value and its receiver location
     Emax = 0    #max energy at a receiver w
     current_max_receiver = (0, 0)
-    for w in W:
-        W_minus_w = W[:]
-        W_minus_w.remove(w)
+    W = list(W)
+    for i, w in enumerate(W):
+        W_minus_w = W[:i] + W[i+1:]
         energy_at_w = energy(W_minus_w, w, alpha)
         # print("at ", point, " energy = ", Epoint)
         if energy_at_w > Emax:
@@ -102,13 +117,10 @@ def polar_to_rectangular(point):
 
 def uniformly_on_circle(k):
     #k: a positive integer
-    #returns a list of k points uniformly spaced on unit circle, in cartersian form
+    #returns a k x 2 array of k points uniformly spaced on unit circle, in cartersian form
     #first point is (1,0)
-    angles_in_degrees = [(360/k) * i for i in range(k)]
-    angles_in_radians = [degree_to_radian(theta) for theta in angles_in_degrees]
-    points_polar = [(1, theta) for theta in angles_in_radians]
-    points_rect = [polar_to_rectangular(a) for a in points_polar]
-    return points_rect    
+    theta = np.linspace(0, 2 * np.pi, k, endpoint=False)
+    return np.stack([np.cos(theta), np.sin(theta)], axis=1)
     
 
 
@@ -155,37 +167,102 @@ def uniformly_on_circle(k):
 
 #=========================
 
-def powerset(iterable):
+def vertexMask(W):
+    #input: a collection W of vertices in [N]
+    #output: the integer bitmask of W, whose bit v-1 is set iff v is in W
+    mask = 0
+    for v in W:
+        mask |= 1 << (v-1)
+    return mask
+
+
+def powerset_masks(n):
     """
-    powerset([1,2,3]) --> () (1,) (2,) (3,) (1,2) (1,3) (2,3) (1,2,3)
+    powerset_masks(3) --> 0 1 2 3 4 5 6 7, the bitmasks of the subsets of an n-set 
     """
-    xs = list(iterable)
-    # note we return an iterator rather than a list
-    return chain.from_iterable(combinations(xs,n) for n in range(len(xs)+1))
+    return range(1 << n)
 
 
 def isForbidden(W, alpha, beta):
     #input: a set of locations W, path loss exponent alpha, and reception threshold beta
     #return True iff W is forbidden, as per defn in my July 2022 tech rep
-    def EuclidDist(si, sj):
-        #returns Euclidean distance between stations si and sj
-        return math.sqrt((si[0] - sj[0]) ** 2 + (si[1] - sj[1]) ** 2)
-
     def Energy(W2, s):
         #energy (or interference at s) due to stations in W2
         res = 0
         for w in W2:
-            res = res + EuclidDist(w,s) ** (-alpha)
+            res = res + Euclidean_distance(w,s) ** (-alpha)
         return res
 
-    for w in W:
-        W_minus_w = W[:]
-        W_minus_w.remove(w)
-        if round(Energy(W_minus_w, w),3) >= beta: #
+    W = list(W)
+    for i, w in enumerate(W):
+        W_minus_w = W[:i] + W[i+1:]
+        if Energy(W_minus_w, w) >= beta - energy_tol: #
             # print('\nW=', W, 'w=', w, 'Energy(W minus w, w)=', Energy(W_minus_w, w))
             return True
         
     return False    
+
+
+def isForbidden_idx(idx, d2, alpha, beta):
+    #input: a list or array idx of (0-based) station indices, the N x N matrix d2 
+    #of squared distances between stations (see pairwise_sqdist), alpha and beta
+    #return True iff the stations in idx form a forbidden set
+    d2 = np.ascontiguousarray(d2, dtype=np.float64)
+    idx = np.ascontiguousarray(idx, dtype=np.int64)
+    return bool(_is_forbidden_nb(d2, idx, alpha, beta))
+
+
+#This kernel is compiled eagerly for the one signature it is called with, at
+#import time, and cache=True stores the machine code next to this module, so later
+#runs load it from disk instead of compiling it again.
+#fastmath without the 'nnan' and 'ninf' flags, so that comparisons stay defined
+#if an infinite or NaN value ever shows up
+@njit('b1(f8[:, ::1], i8[::1], f8, f8)', cache=True,
+      fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})
+def _is_forbidden_nb(d2, idx, alpha, beta):
+    #input: the N x N matrix d2 of squared distances between stations, an array
+    #idx of k (0-based) station indices, path loss exponent alpha and threshold beta
+    #return True iff the k stations form a forbidden set (same test as isForbidden)
+    k = idx.shape[0]
+    beta_minus_eps = beta - energy_tol
+    if k < 2:
+        return False
+
+    #the closest pair bounds the interference from any one station: the two stations 
+    #in that pair each receive at least t_max, and no receiver gets more than (k-1)*t_max
+    min_d2 = d2[idx[0], idx[1]]
+    for i in range(k):
+        for j in range(i+1, k):
+            if d2[idx[i], idx[j]] < min_d2:
+                min_d2 = d2[idx[i], idx[j]]
+    if min_d2 == 0:
+        #as in isForbidden, where 0 ** (-alpha) raises
+        raise ZeroDivisionError("two stations are at the same location")
+    t_max = min_d2 ** (-alpha * 0.5)
+    if t_max >= beta_minus_eps:
+        return True
+    if (k-1) * t_max < beta_minus_eps:
+        return False
+
+    #each pair is visited once and its interference credited to both receivers
+    acc = np.zeros(k)   #acc[i] is the energy at station idx[i] due to the others
+    for i in range(k):
+        for j in range(i+1, k):
+            t = d2[idx[i], idx[j]] ** (-alpha * 0.5)
+            acc[i] += t
+            acc[j] += t
+            #acc only grows, so we can stop as soon as some receiver reaches beta
+            if acc[i] >= beta_minus_eps or acc[j] >= beta_minus_eps:
+                return True
+    return False
+
+
+def pairwise_sqdist(S):
+    #input: a list S of N points in R^2 (or an N x 2 array)
+    #output: the N x N matrix whose (i,j) entry is the squared distance between S[i] and S[j]
+    P = np.asarray(S, dtype=float)
+    diff = P[:, None, :] - P[None, :, :]
+    return np.ascontiguousarray((diff * diff).sum(axis=2))
             
         
 class Hypergraph(object):
@@ -194,20 +271,32 @@ class Hypergraph(object):
         self.numVertices = N
         self.V = list(range(1, N+1))
         self.E = {}
-        #E is stored as a dictionary where E[k] is the list of edges of size k
+        #E is stored as a dictionary where E[k] is the set of edges of size k
+        #(each edge a sorted tuple); self.mask[e] is the bitmask of edge e
         for k in range(0, N+1):
-            self.E[k] = []
-        self.location = {}    
+            self.E[k] = set()
+        self.mask = {}
+        #vertex_to_edges[v] is the set of edges containing vertex v.  It is only
+        #needed by removeSupersetsOf, so it is built there on first use (until 
+        #then it is None) and kept up to date by addEdge and removeEdge afterwards
+        self.vertex_to_edges = None
+        #row i-1 of coords is the location of vertex i, valid once has_location[i-1] is True
+        self.coords = np.zeros((N, 2))
+        self.has_location = np.zeros(N, dtype=bool)
             
     def setLocation(self, i, s):
         #input: a vertex i and a coordinate s
         #sets location i to s
-        self.location[i] = s
+        self.coords[i-1] = s
+        self.has_location[i-1] = True
 
     def getLocation(self, i):
         #input: a vertex i in [N]
-        #returns location of vertex i
-        return self.location[i]
+        #returns location of vertex i (a copy, so changing it does not change H)
+        #raises KeyError if the location of i has not been set
+        if not self.has_location[i-1]:
+            raise KeyError(i)
+        return tuple(self.coords[i-1].tolist())
         
     def addEdge(self, e):
         #e is a tuple or list of vertices
@@ -218,7 +307,11 @@ class Hypergraph(object):
         if max(e) > self.numVertices:
             print("Error!  You are trying to add an edge with endpoint > N.")
         if edge_tuple not in self.E[k]:
-            self.E[k].append(edge_tuple)
+            self.E[k].add(edge_tuple)
+            self.mask[edge_tuple] = vertexMask(edge_tuple)
+            if self.vertex_to_edges is not None:
+                for v in edge_tuple:
+                    self.vertex_to_edges.setdefault(v, set()).add(edge_tuple)
 
     def removeEdge(self, e):
         #e is a tuple or list of vertices
@@ -227,6 +320,10 @@ class Hypergraph(object):
        k = len(edge_tuple)
        if edge_tuple in self.E[k]:
            self.E[k].remove(edge_tuple)
+           del self.mask[edge_tuple]
+           if self.vertex_to_edges is not None:
+               for v in edge_tuple:
+                   self.vertex_to_edges[v].discard(edge_tuple)
 
     def addEdges(self, F):
         #F is a list of edges (each edge is a tuple or list of vertices)
@@ -239,32 +336,41 @@ class Hypergraph(object):
         #Input: a list or tuple e of vertices (e need not be an edge)
         #remove all supersets of e from self.E 
         k = len(e)
-        for i in range(k+1, self.numVertices+1):
-            if len(self.E[i]) >= 1: # if ith level set is nonempty
-                #temp is the elements in ith level set that should be included 
-                temp = []   #creating temp b/c don't want to modify a list I'm iterating on
-                for f in self.E[i]:
-                    if set(e).issubset(set(f)) == False:
-                        temp.append(f)
-                self.E[i] = temp[:]
+        if k == 0:
+            candidates = set(self.mask)
+        else:
+            if self.vertex_to_edges is None:
+                self.vertex_to_edges = {v: set() for v in self.V}
+                for f in self.mask:
+                    for v in f:
+                        self.vertex_to_edges.setdefault(v, set()).add(f)
+            #an edge contains e iff it is in vertex_to_edges[v] for every v in e
+            candidates = set.intersection(*(self.vertex_to_edges.get(v, set()) for v in e))
+        for f in candidates:
+            if len(f) > k:
+                self.removeEdge(f)
     
     def setLevelSet(self, k, F):
         #input: a positive integer k and a list of k-tuples
         #sets the kth level set of hypergraph to be F
-        self.E[k] = F[:]
+        for f in list(self.E[k]):
+            self.removeEdge(f)
+        self.addEdges(F)
         
     def getEdgesLevelSet(self, k):
         #input: a postive integer k
-        #output: the list E[k] of edges of the hypergraph of size k
-        return self.E[k]
+        #output: the sorted list E[k] of edges of the hypergraph of size k
+        return sorted(self.E[k])
         
     def isIndependentSet(self, J):
         #input: a subset J of the vertex set [N]
         #output: true iff J does not contain a hyperedge
-        k = len(J)
+        Jmask = vertexMask(J)
+        k = len(set(J))
         for i in range(1, k+1):
             for edge in self.E[i]:
-                if set(edge).issubset(set(J)):
+                em = self.mask[edge]
+                if (em & Jmask) == em:
                     return False
         return True        
 
@@ -272,39 +378,34 @@ class Hypergraph(object):
         #input: a hypergraph H
         #output: the matrix Delta_ij defined in [LiNegi]
         
-        def zeros_matrix(n, m):
-            #create and return an all-zeros matrix of size n by m
-            A = [[] for i in range(n)]            
-            for i in range(n):
-                for j in range(m):
-                    A[i].append(0)
-            return A
-    
         N = self.numVertices
-        Delta = zeros_matrix(N,N)
-        for k in range(0, N+1):
+        Delta = np.zeros((N, N))
+        for k in range(2, N+1):
+            v = 1.0/(k-1)
             for e in self.E[k]:
-                interfering_pair = itertools.combinations(e, 2)
-                for i, j in interfering_pair:
-                    Delta[i-1][j-1] = max(Delta[i-1][j-1], 1.0/(len(e)-1))
-                    Delta[j-1][i-1] = Delta[i-1][j-1]
+                idx = np.ix_(np.array(e)-1, np.array(e)-1)
+                Delta[idx] = np.maximum(Delta[idx], v)
+        np.fill_diagonal(Delta, 0)
         return Delta
 
+    def AdjacencyMatrix(self):
+        #returns an N x N boolean matrix whose (i-1,j-1) entry is True iff 
+        #vertices i and j belong to a common edge
+        N = self.numVertices
+        Adj_mat = np.zeros((N, N), dtype=bool)
+        for k in range(2, N+1):
+            for e in self.E[k]:
+                idx = np.array(e)-1
+                Adj_mat[np.ix_(idx, idx)] = True
+        np.fill_diagonal(Adj_mat, False)
+        return Adj_mat
+
     def AdjacencyList(self):
         #returns a dictionary Adj where Adj[i] is the set of neighbors of i
+        Adj_mat = self.AdjacencyMatrix()
         Adj = {}
-        N = self.numVertices
-        for i in range(1, N + 1):
-            Adj[i] = []
-            
-        for k in range(0, N+1):
-            for e in self.E[k]:
-                interfering_pair = itertools.combinations(e, 2)
-                for i, j in interfering_pair:
-                    if i not in Adj[j]:
-                        Adj[j].append(i)
-                    if j not in Adj[i]:
-                        Adj[i].append(j)
+        for i in range(1, self.numVertices + 1):
+            Adj[i] = set((np.where(Adj_mat[i-1])[0] + 1).tolist())
         return Adj                
  
                     
@@ -314,6 +415,9 @@ class Hypergraph(object):
         
         Delta = self.Delta()
         Adj = self.AdjacencyList()
+
+        #work with bitmasks: an edge with mask em is contained in J iff em & J == em
+        edge_masks = list(self.mask.values())
         
         Delta_p = []    #intermediate results 
         Delta_pp = []   #intermediate results 
@@ -323,21 +427,34 @@ class Hypergraph(object):
             #find set Hi of all edges containing i, and compute Delta_i
             Delta_i_p = 0   #p for prime. Initialize b/c max over empty set is zero
             Delta_i_pp = 0  #pp for double prime (see my TIT paper)
-            subsetsNi = powerset(Adj[i])
-            for K in subsetsNi:  #for each J in Ni \int I(H)
-                J = list(K) 
-                if len(J) >= 1 and self.isIndependentSet(J):
-                    s = 0
-                    for j in J:
-                        s += Delta[i-1][j-1]
-                    Delta_i_p = max(Delta_i_p, s)
-                L = [i]
+            nbrs = sorted(Adj[i])
+            row = Delta[i-1].tolist()
+            #J is a set of neighbors of i, so only edges avoiding i can lie in J, and
+            #only edges through i can lie in J + {i} without already lying in J
+            ibit = 1 << (i-1)
+            edges_through_i = [em for em in edge_masks if em & ibit]
+            edges_not_through_i = [em for em in edge_masks if not em & ibit]
+            #bit b of sub selects the neighbor nbrs[b].  Clearing the lowest bit of sub
+            #gives a subset visited earlier, so J's vertex mask and its sum of 
+            #Delta[i-1][j-1] over j in J are obtained from that subset's in one step
+            Jmasks = [0] * (1 << len(nbrs))
+            sums = [0.0] * (1 << len(nbrs))
+            for sub in powerset_masks(len(nbrs)):  #for each J in Ni \int I(H)
+                if sub == 0:
+                    continue
+                low = sub & -sub
+                j = nbrs[low.bit_length() - 1]
+                Jmask = Jmasks[sub ^ low] | (1 << (j-1))
+                s = sums[sub ^ low] + row[j-1]
+                Jmasks[sub] = Jmask
+                sums[sub] = s
+                if not all((em & Jmask) != em for em in edges_not_through_i):
+                    continue    #then J + {i} is not independent either
+                Delta_i_p = max(Delta_i_p, s)
                 
-                if len(J) >= 1 and self.isIndependentSet(set(J).union(set(L))):
-                    s = 1
-                    for j in J:
-                        s += Delta[i-1][j-1]
-                    Delta_i_pp = max(Delta_i_pp, s)
+                Ji_mask = Jmask | ibit
+                if all((em & Ji_mask) != em for em in edges_through_i):
+                    Delta_i_pp = max(Delta_i_pp, 1 + s)
                     
             res = max(res, Delta_i_p, Delta_i_pp)
             Delta_p.append( Delta_i_p)
@@ -351,7 +468,7 @@ class Hypergraph(object):
         #prints the list of edges of the hypergraph, started with lowest level sets
         edgeList = []
         for k in range(0, self.numVertices+1):
-            edgeList = edgeList + self.E[k]
+            edgeList = edgeList + self.getEdgesLevelSet(k)
         print(edgeList)    
     
     def getNumEdges(self):
@@ -364,8 +481,31 @@ class Hypergraph(object):
         #prints the list of edges of the hypergraph, in order of size (ie by level sets)
         print("The hyperedges are: ")
         for k in range(self.numVertices, -1, -1):
-            print("level", k, ":", self.E[k])
+            print("level", k, ":", self.getEdgesLevelSet(k))
             
+#compiled on first use rather than at import, since the bisection in smallest_gamma.py
+#never generates a hypergraph and would otherwise pay for building a parallel kernel
+@njit(parallel=True, cache=True)
+def _level_sweep(subs, sub_masks, d2, alpha, beta, known_masks):
+    #input: a num_subs x k array subs of candidate sets (rows of 0-based station
+    #indices) with their bitmasks sub_masks, d2, alpha, beta, and the bitmasks 
+    #known_masks of the edges found at lower levels
+    #returns a boolean array whose s-th entry is True iff subs[s] is a new edge, 
+    #i.e. subs[s] is forbidden and contains no known edge
+    num_subs = subs.shape[0]
+    res = np.zeros(num_subs, dtype=np.bool_)
+    for s in prange(num_subs):
+        wmask = sub_masks[s]
+        minimal = True
+        for e in known_masks:
+            if (e & wmask) == e:
+                minimal = False
+                break
+        if minimal:
+            res[s] = _is_forbidden_nb(d2, subs[s], alpha, beta)
+    return res
+
+
 def GenerateHypergraph(S, alpha, beta):
     #input: a wireles network <S,alpha,beta>, as per my July'22 tech rep
     #output: the hypergraph H=(V,E) generated by the wireless network
@@ -375,27 +515,54 @@ def GenerateHypergraph(S, alpha, beta):
     H = Hypergraph(N)  #create empty hypergraph
     for i in range(N):
         H.setLocation(i+1, S[i])
+    addMinimalForbiddenSets(H, pairwise_sqdist(H.coords), alpha, beta)
+    return H
+
+def GenerateHypergraph_precomputed(d2, alpha, beta):
+    #same as GenerateHypergraph, but takes the N x N matrix d2 of squared distances 
+    #between the stations (see pairwise_sqdist) instead of their locations, so that
+    #callers trying several values of alpha on the same stations compute it only once
+    #Note: the hypergraph returned carries no locations (getLocation raises KeyError)
+    H = Hypergraph(d2.shape[0])  #create empty hypergraph
+    addMinimalForbiddenSets(H, d2, alpha, beta)
+    return H
+
+def addMinimalForbiddenSets(H, d2, alpha, beta):
+    #input: a hypergraph H with no edges, the matrix d2 of squared distances between
+    #its stations, alpha and beta
+    #adds the minimal forbidden sets of the wireless network to H as its edges
+    N = H.numVertices
+    d2 = np.ascontiguousarray(d2, dtype=np.float64)   #the layout the kernels are compiled for
+    #check for coincident stations here rather than inside the parallel sweep
+    if (d2[~np.eye(N, dtype=bool)] == 0).any():
+        raise ZeroDivisionError("two stations are at the same location")
         
-    #add level sets 2 to N (and will later remove elements to get MFS)
-    for k in range(2, N+1):
-        H.addEdges(itertools.combinations(range(1,N+1), k))
-        
-    #remove subsets so that only minimal forbidden sets remain in H.E
+    #go up the poset one level set at a time.  A candidate W that contains an edge
+    #found at a lower level is forbidden but not minimal, so it is skipped without
+    #being tested or stored.  Edges are kept as bitmasks (bit v-1 set iff v in W) 
+    #to make this check cheap.  Candidates of the same size cannot contain one
+    #another, so each level is tested in parallel.  The candidates are generated 
+    #lazily and packed into arrays chunk_size at a time, so that a level set is 
+    #never held in memory in full.
+    chunk_size = 4096
+    found_masks = []
     for k in range(2, N+1):
-        temp = [] #don't want to iterate over an object I'm modifying   
-        
-        for W in H.getEdgesLevelSet(k):
-            stationsW = [H.getLocation(w) for w in W] #converts indices to locations
-            if isForbidden(stationsW, alpha, beta):
+        known_masks = np.array(found_masks, dtype=np.int64)
+        candidates = itertools.combinations(range(N), k)
+        temp = []
+        while True:
+            chunk = list(itertools.islice(candidates, chunk_size))
+            if not chunk:
+                break
+            subs = np.array(chunk, dtype=np.int64)
+            sub_masks = (np.int64(1) << subs).sum(axis=1)
+            new_edges = _level_sweep(subs, sub_masks, d2, alpha, beta, known_masks)
+            for s in np.flatnonzero(new_edges):
                 #know W is also minimal forbidden (not just forbidden), since we started with smallest k first
                 #so add W as hyperedge
-                temp.append(W)
-                H.removeSupersetsOf(W)
+                temp.append(tuple((subs[s] + 1).tolist()))
+                found_masks.append(int(sub_masks[s]))
         H.setLevelSet(k, temp)
-        
-                
-        
-    return H
             
 #===================================================
 # debug = 1
@@ -23,20 +23,21 @@ running the program below, for which the output obtained is:
 
 The smallest value of the path loss exponent gamma such that
 U_3 is feasible is 
-gamma =  1.26312255859375
+gamma =  1.26202392578125
 
 The smallest value of the path loss exponent gamma such that
 U_4 is feasible is 
-gamma =  2.54412841796875
+gamma =  2.54302978515625
 
 The smallest value of the path loss exponent gamma such that
 U_5 is feasible is 
-gamma =  4.85784912109375
+gamma =  4.85565185546875
 
 ===End of Output===
 """
 
 #import hypergraph_wireless01.py
+import numpy as np
 from hypergraph_wireless import *
 
 #confirm hand calculations in my notes 2G.(2)
@@ -45,28 +46,68 @@ from hypergraph_wireless import *
 # beta = 1
 # s0 = (0, 0)
 
-def is_Ur_feasible(alpha, r, beta = 1):
+def is_Ur_feasible(alpha, r, beta = 1, d2 = None):
     #input: alpha is path loss exponent, r is a positive integer
     #Ur = r points uniformly placed on unit circle
+    #d2 (optional) = pairwise_sqdist(Ur), to avoid recomputing it for every alpha
     #return True iff Ur is feasible
-    S = uniformly_on_circle(r)
-    H = GenerateHypergraph(S, alpha, beta)
+    if d2 is None:
+        d2 = pairwise_sqdist(uniformly_on_circle(r))
+    H = GenerateHypergraph_precomputed(d2, alpha, beta)
     m = H.getNumEdges()
     if m >= 1:   #then there exists a forbidden set
         return False
     else:
         return True
     
+def is_Ur_feasible_sym(alpha, r, beta = 1, d2 = None):
+    #same as is_Ur_feasible, but without generating the hypergraph of Ur.
+    #If some subset of Ur is forbidden then so is Ur itself, since the other stations
+    #only add interference, so Ur is feasible iff Ur is not forbidden, and it 
+    #suffices to test the single set Ur.
+    if d2 is None:
+        d2 = pairwise_sqdist(uniformly_on_circle(r))
+    return not isForbidden_idx(np.arange(r), d2, alpha, beta)
+    
+def is_Ur_feasible_grid(alphas, r, beta = 1, d2 = None):
+    #input: a 1-d array alphas of path loss exponents, r a positive integer
+    #returns a boolean array whose a-th entry is True iff Ur is feasible for alphas[a]
+    #If some subset of Ur is forbidden then so is Ur itself, since the other stations
+    #only add interference, so Ur is feasible iff Ur is not forbidden. 
+    if d2 is None:
+        d2 = pairwise_sqdist(uniformly_on_circle(r))
+    off_diagonal = ~np.eye(r, dtype=bool)
+    log_d2 = np.log(np.where(off_diagonal, d2, 1))
+    #interf[a,i,j] = d2[i,j] ** (-alphas[a]/2) for i != j, and 0 on the diagonal
+    interf = np.exp(np.einsum('a,ij->aij', -0.5 * np.asarray(alphas), log_d2)) * off_diagonal
+    row_sums = interf.sum(axis=2)   #row_sums[a,i] = energy at station i in Ur
+    return ~(row_sums >= beta - energy_tol).any(axis=1)
+    
 def smallest_alpha_Ur_is_feasible(r=5, low = 4, high = 5):
     #output:=smallest alpha such that Ur is feasible
 
+    #the stations stay the same while alpha varies, so compute their distances once
+    d2 = pairwise_sqdist(uniformly_on_circle(r))
+
+    tolerance = 0.001   #for alpha value
+
+    #first evaluate a grid of 33 equally spaced alphas in one vectorized pass.  The grid
+    #points are exactly the midpoints the first five bisection steps would try, so the
+    #interval between the last infeasible and first feasible grid point is where five 
+    #bisection steps would end up
+    if (high - low) / 32 > tolerance:
+        A = np.linspace(low, high, 33)
+        feasible = is_Ur_feasible_grid(A, r, d2 = d2)
+        i = int(np.argmax(feasible)) if feasible.any() else len(A) - 1
+        i = max(i, 1)
+        low, high = float(A[i-1]), float(A[i])
+
     #use bisection search
     mid = (low + high) / 2
-    tolerance = 0.001   #for alpha value
-    while abs(mid-low) > 0.001:
+    while abs(mid-low) > tolerance:
         #print(mid)
         #do another iteration of bisection search
-        if is_Ur_feasible(mid, r) == True:
+        if is_Ur_feasible_sym(mid, r, d2 = d2) == True:
             #print("Ur is feasible when alpha =", mid)
             high = mid
         else: